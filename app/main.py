@@ -1,13 +1,25 @@
 # app/main.py
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from app.routes import apriori, predict
 from app.models import venta_model
+from app.services import apriori_service, ingesta_service
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Confirma las ventas que queden en el buffer antes de salir
+    ingesta_service.detener()
+    apriori_service.cerrar_pool()
+
 
 app = FastAPI(
     title="API-Pan",
     description="API para análisis de ventas de panadería",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 app.include_router(apriori.router)
-app.include_router(predict.router)
\ No newline at end of file
+app.include_router(predict.router)
@@ -0,0 +1,23 @@
+# app/models/cliente_model.py
+from sqlalchemy import JSON, Column, Float, Integer, String
+from app.models.venta_model import Base
+
+
+class ClienteFeaturesORM(Base):
+    """
+    Features de KMeans por cliente, mantenidas al registrar cada venta.
+    Guarda contadores y acumulados, no las features finales: esas se
+    calculan al leer (ver features_service.features_de_cliente).
+    """
+    __tablename__ = "clientes_features"
+
+    id_cliente = Column(String, primary_key=True)
+    n_compras = Column(Integer, nullable=False, default=0)      # ventas distintas
+    suma_valor = Column(Float, nullable=False, default=0.0)     # suma de precio_total
+    n_lineas = Column(Integer, nullable=False, default=0)       # productos comprados
+    n_recompras = Column(Integer, nullable=False, default=0)    # líneas de productos ya comprados antes
+    hist_horas = Column(JSON, nullable=False, default=dict)     # {"mañana": n, "tarde": n, "noche": n}
+    hist_dias = Column(JSON, nullable=False, default=dict)      # {"lunes": n, ...}
+    productos = Column(JSON, nullable=False, default=list)      # ids de producto ya comprados
+    ventana = Column(JSON, nullable=False, default=dict)        # {YYYYMMDD: compras}, últimos 30 días
+    ultima_fecha = Column(Integer)                              # YYYYMMDD
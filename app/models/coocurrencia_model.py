@@ -0,0 +1,17 @@
+# app/models/coocurrencia_model.py
+from sqlalchemy import Column, Integer
+from app.models.venta_model import Base
+
+
+class CoocurrenciaORM(Base):
+    """
+    Matriz producto x producto por fecha, dispersa y triangular superior:
+    solo se guardan las celdas con id_a <= id_b y n > 0. La diagonal
+    (id_a == id_b) es el número de ventas que contienen el producto.
+    """
+    __tablename__ = "coocurrencias"
+
+    fecha = Column(Integer, primary_key=True)        # YYYYMMDD
+    id_a = Column(Integer, primary_key=True)
+    id_b = Column(Integer, primary_key=True)
+    n = Column(Integer, nullable=False, default=0)   # ventas que contienen ambos
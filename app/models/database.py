@@ -1,17 +1,123 @@
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from app.models.venta_model import Base
+from sqlalchemy import create_engine, event, func, insert, inspect, text
+from sqlalchemy.orm import Session, sessionmaker
+from app.models.venta_model import Base, FechaORM, VentaORM
+from app.models import cliente_model, coocurrencia_model  # noqa: F401  registran sus tablas en Base
+from app.utils.fechas import int_a_fecha
+
+# API_PAN_DATA permite usar otra carpeta de datos (p. ej. en pruebas de carga)
+DATA_PATH = os.environ.get('API_PAN_DATA', os.path.join(os.path.dirname(__file__), '..', '..', 'data'))
+# Almacén consolidado: todas las fechas en una sola base indexada por fecha
+DB_PATH = os.path.join(DATA_PATH, 'todos', 'ventas.sqlite')
+
+_engine = None
+_SessionLocal = None
+
 
 def get_engine_for_date(fecha: str):
-    folder = os.path.join(os.path.dirname(__file__), '..', '..', 'data', fecha)
+    """Base por día (formato antiguo). Solo la usa la migración."""
+    folder = os.path.join(DATA_PATH, fecha)
     os.makedirs(folder, exist_ok=True)
     db_path = os.path.join(folder, 'ventas.sqlite')
     engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
     return engine
 
-def get_session_for_date(fecha: str):
-    engine = get_engine_for_date(fecha)
-    Base.metadata.create_all(engine)  # 👈 Crea la tabla si no existe
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    return SessionLocal()
+
+def actualizar_esquema(engine):
+    """Crea tablas e índices que falten en una base creada con el esquema antiguo."""
+    Base.metadata.create_all(engine)
+    inspector = inspect(engine)
+    existentes = {
+        tabla.name: {c["name"] for c in inspector.get_columns(tabla.name)}
+        for tabla in Base.metadata.sorted_tables
+    }
+    with engine.begin() as conn:
+        for tabla in Base.metadata.sorted_tables:
+            for columna in tabla.columns:
+                if columna.name not in existentes[tabla.name]:
+                    tipo = columna.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f"ALTER TABLE {tabla.name} ADD COLUMN {columna.name} {tipo}"))
+        if "fecha" not in existentes[VentaORM.__tablename__]:
+            # "DD-MM-YYYY" -> YYYYMMDD
+            conn.execute(text(
+                "UPDATE ventas SET fecha = CAST(substr(fecha_venta, 7, 4) || substr(fecha_venta, 4, 2)"
+                " || substr(fecha_venta, 1, 2) AS INTEGER) WHERE fecha_venta IS NOT NULL"
+            ))
+    for indice in VentaORM.__table__.indexes:
+        indice.create(engine, checkfirst=True)
+    completar_catalogo(engine)
+    completar_coocurrencias(engine)
+
+
+def completar_catalogo(engine):
+    """
+    Da de alta en el catálogo las fechas que ya tienen ventas pero no
+    entrada en `fechas` (bases con el esquema antiguo). Quedan con n_ventas
+    nulo para que completar_coocurrencias reconstruya su matriz.
+    """
+    db = Session(bind=engine, autoflush=False)
+    try:
+        catalogadas = db.query(FechaORM.fecha)
+        faltantes = (
+            db.query(VentaORM.fecha, func.count(VentaORM.id))
+            .filter(VentaORM.fecha.isnot(None), VentaORM.fecha.not_in(catalogadas))
+            .group_by(VentaORM.fecha)
+            .all()
+        )
+        # insert explícito: con el ORM, n_ventas=None tomaría el default 0
+        for fecha, n_registros in faltantes:
+            db.execute(insert(FechaORM).values(
+                fecha=fecha, fecha_venta=int_a_fecha(fecha), n_registros=n_registros, n_ventas=None
+            ))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def completar_coocurrencias(engine):
+    """
+    Fechas del catálogo anteriores a la matriz de co-ocurrencia (n_ventas
+    nulo): se reconstruyen su matriz y su número de ventas desde las filas.
+    """
+    # Import diferido: coocurrencia_service importa este módulo
+    from app.services.coocurrencia_service import reconstruir_coocurrencias
+
+    db = Session(bind=engine, autoflush=False)
+    try:
+        pendientes = db.query(FechaORM).filter(FechaORM.n_ventas.is_(None)).all()
+        for entrada in pendientes:
+            entrada.n_ventas = reconstruir_coocurrencias(db, entrada.fecha_venta)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _configurar_sqlite(conexion, _):
+    cursor = conexion.cursor()
+    # WAL: las lecturas no esperan al escritor; busy_timeout evita "database is locked"
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+        _engine = create_engine(f"sqlite:///{DB_PATH}", connect_args={"check_same_thread": False})
+        event.listen(_engine, "connect", _configurar_sqlite)
+        actualizar_esquema(_engine)
+    return _engine
+
+
+def get_session():
+    global _SessionLocal
+    if _SessionLocal is None:
+        _SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
+    return _SessionLocal()
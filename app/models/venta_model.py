@@ -1,5 +1,5 @@
 # app/models/venta_model.py
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Float, Index, Integer, String
 from sqlalchemy.orm import declarative_base
 
 Base = declarative_base()
@@ -10,4 +10,25 @@ class VentaORM(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     id_venta = Column(Integer)
     id_producto = Column(Integer)
-    fecha_venta = Column(String)
+    fecha_venta = Column(String)   # formato "DD-MM-YYYY" (compatibilidad)
+    fecha = Column(Integer)        # YYYYMMDD, ordenable
+    # Opcionales: solo llegan en ventas con cliente identificado
+    id_cliente = Column(String)
+    hora = Column(Integer)         # 0-23
+    cantidad = Column(Integer)
+    precio_total = Column(Float)
+
+    __table_args__ = (
+        Index("ix_ventas_fecha_venta_id", "fecha", "id_venta"),
+        Index("ix_ventas_fecha_producto", "fecha", "id_producto"),
+    )
+
+
+class FechaORM(Base):
+    """Catálogo de fechas presentes en la tabla ventas."""
+    __tablename__ = "fechas"
+
+    fecha = Column(Integer, primary_key=True)     # YYYYMMDD
+    fecha_venta = Column(String, nullable=False)  # "DD-MM-YYYY"
+    n_registros = Column(Integer, nullable=False, default=0)
+    n_ventas = Column(Integer, default=0)         # transacciones distintas
@@ -1,34 +1,129 @@
-from fastapi import APIRouter, Query, HTTPException
-from app.services.apriori_service import aplicar_apriori, aplicar_apriori_todos, guardar_ventas_y_aplicar_apriori
-from typing import List, Dict, Any
+import asyncio
+import json
+from fastapi import APIRouter, Query, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from app.services.apriori_service import aplicar_apriori, aplicar_apriori_rango, aplicar_apriori_todos
+from app.services.eventos_service import canal
+from app.services.ingesta_service import minero, registrar_ventas
+from app.utils.fechas import fecha_a_int
+from app.services.coocurrencia_service import metricas_par, reglas_de_pares
+from typing import List, Dict, Any, Optional
 
 router = APIRouter()
 
-@router.get("/apriori/{fecha}")
-def ejecutar_apriori_por_fecha(
-    fecha: str,
+# Segundos sin eventos tras los que se manda un comentario para mantener viva la conexión
+SSE_KEEPALIVE = 15
+
+# Las rutas fijas van antes de /apriori/{fecha} para que no queden ocultas
+@router.get("/apriori/todos")
+def ejecutar_apriori_para_todos():
+    try:
+        resultado = aplicar_apriori_todos()
+        return resultado
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/apriori/rango")
+def ejecutar_apriori_por_rango(
+    desde: str = Query(..., description="Fecha inicial DD-MM-YYYY"),
+    hasta: str = Query(..., description="Fecha final DD-MM-YYYY"),
     min_support: float = Query(0.1, ge=0.01, le=1.0, description="Soporte mínimo entre 0.01 y 1.0"),
     min_confidence: float = Query(0.5, ge=0.0, le=1.0, description="Confianza mínima entre 0.0 y 1.0")
 ):
     try:
-        resultado = aplicar_apriori(fecha)
-        return resultado
+        return aplicar_apriori_rango(desde, hasta, min_support, min_confidence)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/apriori/todos")
-def ejecutar_apriori_para_todos():
+@router.get("/apriori/pares")
+def obtener_reglas_de_pares(
+    desde: str = Query(..., description="Fecha DD-MM-YYYY"),
+    hasta: Optional[str] = Query(None, description="Fecha final DD-MM-YYYY; por defecto igual a desde"),
+    min_support: float = Query(0.1, ge=0.01, le=1.0, description="Soporte mínimo entre 0.01 y 1.0"),
+    min_confidence: float = Query(0.5, ge=0.0, le=1.0, description="Confianza mínima entre 0.0 y 1.0")
+):
     try:
-        resultado = aplicar_apriori_todos()
+        return reglas_de_pares(desde, hasta, min_support, min_confidence)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/apriori/par")
+def obtener_metricas_par(
+    a: int = Query(..., description="Producto antecedente"),
+    b: int = Query(..., description="Producto consecuente"),
+    desde: str = Query(..., description="Fecha DD-MM-YYYY"),
+    hasta: Optional[str] = Query(None, description="Fecha final DD-MM-YYYY; por defecto igual a desde")
+):
+    try:
+        return metricas_par(desde, a, b, hasta)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/apriori/stream/{fecha}")
+async def suscribir_reglas(fecha: str, request: Request):
+    """
+    Server-Sent Events con las reglas de la fecha: primero un evento
+    "snapshot" con todas y después eventos "delta" con agregadas,
+    eliminadas y modificadas cada vez que nuevas ventas las cambian.
+    Si un minado falla se envía un evento "error" con el detalle.
+    """
+    try:
+        fecha_a_int(fecha)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def eventos():
+        suscripcion, inicial = canal.suscribir(fecha)
+        try:
+            if inicial is not None:
+                yield _formato_sse(inicial)
+            else:
+                # Nadie ha minado esta fecha todavía: el minero publicará la foto
+                minero.marcar([fecha])
+            while not await request.is_disconnected():
+                try:
+                    evento = await asyncio.wait_for(suscripcion[1].get(), timeout=SSE_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield _formato_sse(evento)
+        finally:
+            canal.cancelar(fecha, suscripcion)
+
+    return StreamingResponse(
+        eventos(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _formato_sse(evento):
+    datos = json.dumps(evento, ensure_ascii=False)
+    return f"id: {evento['version']}\nevent: {evento['tipo']}\ndata: {datos}\n\n"
+
+
+@router.get("/apriori/{fecha}")
+def ejecutar_apriori_por_fecha(
+    fecha: str,
+    min_support: float = Query(0.1, ge=0.01, le=1.0, description="Soporte mínimo entre 0.01 y 1.0"),
+    min_confidence: float = Query(0.5, ge=0.0, le=1.0, description="Confianza mínima entre 0.0 y 1.0")
+):
+    try:
+        resultado = aplicar_apriori(fecha)
         return resultado
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+
 @router.post("/venta/{fecha}")
 def registrar_ventas_y_aplicar_apriori(
     fecha: str,
-    ventas: List[Dict[str, Any]]
+    ventas: List[Dict[str, Any]],
+    minar: bool = Query(False, description="Esperar al minado y devolver las reglas de la fecha")
 ):
     """
     Ejemplo del body JSON esperado:
@@ -37,8 +132,16 @@ def registrar_ventas_y_aplicar_apriori(
         { "id_venta": 1, "producto": { "id_producto": 2 } },
         { "id_venta": 2, "producto": { "id_producto": 1 } }
     ]
+    Campos opcionales para las features de clientes: "id_cliente", "hora"
+    y en "producto": "cantidad", "precio_total".
+
+    Responde cuando las ventas están confirmadas en la base. El re-minado de
+    la fecha se hace en segundo plano salvo que se pida minar=true.
     """
     try:
-        return guardar_ventas_y_aplicar_apriori(fecha, ventas)
+        registros = registrar_ventas(fecha, ventas)
+        if minar:
+            return aplicar_apriori(fecha)
+        return {"mensaje": f"{registros} ventas registradas para {fecha}", "registros": registros}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,6 +1,6 @@
 # app/routes/predict.py
 from fastapi import APIRouter
-from app.services.kmeans_service import predecir_cluster, predecir_desde_archivo
+from app.services.kmeans_service import predecir_cluster, predecir_clientes, predecir_desde_archivo
 from app.models.input_schema import UsuarioInput
 
 router = APIRouter()
@@ -13,4 +13,8 @@ def hacer_prediccion(usuario: UsuarioInput):
 @router.get("/predecir-todos", tags=["Predicción"])
 def predecir_todos():
     resultados = predecir_desde_archivo()
-    return {"predicciones": resultados}
\ No newline at end of file
+    return {"predicciones": resultados}
+
+@router.get("/predecir-clientes", tags=["Predicción"])
+def predecir_clientes_registrados():
+    return {"predicciones": predecir_clientes()}
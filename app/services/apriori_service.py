@@ -2,44 +2,195 @@
 import json
 import os
 from collections import defaultdict
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
 from typing import List, Dict, Any
+import numpy as np
 import pandas as pd
-from app.models.database import get_session_for_date
+from app.models.database import DATA_PATH, get_session
 
 from mlxtend.frequent_patterns import apriori, association_rules
 from sqlalchemy.orm import Session
-from app.models.venta_model import VentaORM
+from app.models.venta_model import VentaORM, FechaORM
+from app.services.coocurrencia_service import actualizar_coocurrencias
+from app.services.features_service import actualizar_features
+from app.utils.fechas import fecha_a_int
 
-DATA_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'data')
+# Por encima de este número de transacciones se mina por particiones (SON)
+TAM_PARTICION = 20000
+# Procesos del pool de minado; None usa todos los núcleos
+N_PROCESOS = None
 
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def obtener_pool() -> ProcessPoolExecutor:
+    """
+    Pool de minado compartido. Se crea con forkserver: el minado se lanza
+    desde hilos (uvicorn, minero diferido) y hacer fork de un proceso con
+    varios hilos puede dejar locks tomados en los hijos.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=N_PROCESOS, mp_context=get_context("forkserver"))
+        return _pool
+
+
+def cerrar_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+            _pool = None
 
-def ejecutar_apriori_sqlite(fecha: str, min_support=0.1, min_confidence=0.5):
-    db: Session = get_session_for_date(fecha)
-    registros = db.query(VentaORM).filter(VentaORM.fecha_venta == fecha).all()
+
+def obtener_transacciones(db: Session, desde: int, hasta: int) -> List[set]:
+    # Rango sobre el índice (fecha, id_venta): solo se leen las fechas pedidas
+    registros = (
+        db.query(VentaORM.fecha, VentaORM.id_venta, VentaORM.id_producto)
+        .filter(VentaORM.fecha.between(desde, hasta))
+        .all()
+    )
 
     transacciones = defaultdict(set)
-    for r in registros:
-        transacciones[r.id_venta].add(r.id_producto)
+    for fecha, id_venta, id_producto in registros:
+        transacciones[(fecha, id_venta)].add(id_producto)
+    return list(transacciones.values())
 
-    lista_transacciones = list(transacciones.values())
-    if not lista_transacciones:
-        return {"mensaje": f"No hay datos para la fecha {fecha}"}
 
-    all_items = sorted({item for t in lista_transacciones for item in t})
-    df = pd.DataFrame([{item: item in t for item in all_items} for t in lista_transacciones])
+def fechas_en_rango(db: Session, desde: int, hasta: int) -> List[str]:
+    filas = (
+        db.query(FechaORM.fecha_venta)
+        .filter(FechaORM.fecha.between(desde, hasta))
+        .order_by(FechaORM.fecha)
+        .all()
+    )
+    return [f[0] for f in filas]
 
-    frecuentes = apriori(df, min_support=min_support, use_colnames=True)
+
+def _matriz_booleana(transacciones: List[set], items: List[int]) -> pd.DataFrame:
+    return pd.DataFrame([{item: item in t for item in items} for t in transacciones], columns=items)
+
+
+def _orden_itemset(itemset) -> tuple:
+    return (len(itemset), sorted(itemset))
+
+
+def _reglas_desde_frecuentes(frecuentes: pd.DataFrame, min_confidence: float):
+    if frecuentes.empty:
+        return []
+    # Orden fijo de itemsets para que ambos caminos devuelvan las reglas en el mismo orden
+    orden = sorted(range(len(frecuentes)), key=lambda i: _orden_itemset(frecuentes["itemsets"].iloc[i]))
+    frecuentes = frecuentes.iloc[orden].reset_index(drop=True)
+    frecuentes["itemsets"] = [frozenset(sorted(c)) for c in frecuentes["itemsets"]]
     reglas = association_rules(frecuentes, metric="confidence", min_threshold=min_confidence)
 
     resultados = []
     for _, row in reglas.iterrows():
         resultados.append({
-            "antecedente": list(row["antecedents"]),
-            "consecuente": list(row["consequents"]),
+            "antecedente": sorted(row["antecedents"]),
+            "consecuente": sorted(row["consequents"]),
             "soporte": round(row["support"], 4),
             "confianza": round(row["confidence"], 4),
             "lift": round(row["lift"], 4)
         })
+    return resultados
+
+
+def minar_reglas(lista_transacciones: List[set], min_support=0.1, min_confidence=0.5):
+    all_items = sorted({item for t in lista_transacciones for item in t})
+    df = _matriz_booleana(lista_transacciones, all_items)
+
+    frecuentes = apriori(df, min_support=min_support, use_colnames=True)
+    return _reglas_desde_frecuentes(frecuentes, min_confidence)
+
+
+def _candidatos_locales(particion: List[set], min_support: float) -> List[frozenset]:
+    # Pasada 1 de SON: itemsets frecuentes dentro de la partición
+    items = sorted({item for t in particion for item in t})
+    frecuentes = apriori(_matriz_booleana(particion, items), min_support=min_support, use_colnames=True)
+    return list(frecuentes["itemsets"])
+
+
+def _contar_candidatos(particion: List[set], candidatos: List[frozenset]) -> np.ndarray:
+    # Pasada 2 de SON: ocurrencias de cada candidato en la partición
+    items = sorted({item for c in candidatos for item in c})
+    columnas = {item: i for i, item in enumerate(items)}
+    matriz = np.zeros((len(particion), len(items)), dtype=bool)
+    for fila, t in enumerate(particion):
+        for item in t:
+            if item in columnas:
+                matriz[fila, columnas[item]] = True
+
+    conteos = np.empty(len(candidatos), dtype=np.int64)
+    for i, c in enumerate(candidatos):
+        conteos[i] = matriz[:, [columnas[item] for item in c]].all(axis=1).sum()
+    return conteos
+
+
+def _particionar(lista_transacciones: List[set], tam_particion: int) -> List[List[set]]:
+    # Particiones de tamaño casi igual: una cola diminuta haría frecuente
+    # cualquier subconjunto de sus cestas y dispararía los candidatos
+    n_particiones = -(-len(lista_transacciones) // tam_particion)
+    base, resto = divmod(len(lista_transacciones), n_particiones)
+    particiones, inicio = [], 0
+    for i in range(n_particiones):
+        fin = inicio + base + (1 if i < resto else 0)
+        particiones.append(lista_transacciones[inicio:fin])
+        inicio = fin
+    return particiones
+
+
+def minar_reglas_particionado(
+    lista_transacciones: List[set],
+    min_support=0.1,
+    min_confidence=0.5,
+    tam_particion=TAM_PARTICION
+):
+    """
+    Apriori en dos pasadas (algoritmo SON). Todo itemset frecuente en el
+    total es frecuente en al menos una partición, así que la unión de los
+    frecuentes locales contiene todos los candidatos; la segunda pasada
+    cuenta su soporte real. Da las mismas reglas que minar_reglas, pero la
+    memoria máxima depende de tam_particion y no del total.
+    """
+    particiones = _particionar(lista_transacciones, tam_particion)
+
+    pool = obtener_pool()
+    locales = pool.map(_candidatos_locales, particiones, [min_support] * len(particiones))
+    candidatos = sorted(
+        {c for lista in locales for c in lista},
+        key=_orden_itemset
+    )
+    conteos = sum(pool.map(_contar_candidatos, particiones, [candidatos] * len(particiones)))
+
+    soporte = conteos / len(lista_transacciones)
+    frecuentes = pd.DataFrame({"support": soporte, "itemsets": candidatos})
+    frecuentes = frecuentes[frecuentes["support"] >= min_support].reset_index(drop=True)
+    return _reglas_desde_frecuentes(frecuentes, min_confidence)
+
+
+def minar(lista_transacciones: List[set], min_support=0.1, min_confidence=0.5):
+    if len(lista_transacciones) > TAM_PARTICION:
+        return minar_reglas_particionado(lista_transacciones, min_support, min_confidence)
+    return minar_reglas(lista_transacciones, min_support, min_confidence)
+
+
+def ejecutar_apriori_sqlite(fecha: str, min_support=0.1, min_confidence=0.5):
+    clave = fecha_a_int(fecha)
+    db: Session = get_session()
+    try:
+        lista_transacciones = obtener_transacciones(db, clave, clave)
+    finally:
+        db.close()
+
+    if not lista_transacciones:
+        return {"mensaje": f"No hay datos para la fecha {fecha}"}
+
+    resultados = minar(lista_transacciones, min_support, min_confidence)
 
     carpeta = os.path.join(DATA_PATH, fecha)
     os.makedirs(carpeta, exist_ok=True)
@@ -57,10 +208,37 @@ def aplicar_apriori(fecha: str, min_support=0.1, min_confidence=0.5):
     return ejecutar_apriori_sqlite(fecha, min_support, min_confidence)
 
 
+def aplicar_apriori_rango(desde: str, hasta: str, min_support=0.1, min_confidence=0.5):
+    inicio, fin = fecha_a_int(desde), fecha_a_int(hasta)
+    if inicio > fin:
+        raise ValueError(f"Rango inválido: {desde} es posterior a {hasta}")
+
+    db: Session = get_session()
+    try:
+        fechas = fechas_en_rango(db, inicio, fin)
+        lista_transacciones = obtener_transacciones(db, inicio, fin) if fechas else []
+    finally:
+        db.close()
+
+    if not lista_transacciones:
+        return {"mensaje": f"No hay datos entre {desde} y {hasta}"}
+
+    resultados = minar(lista_transacciones, min_support, min_confidence)
+    return {
+        "mensaje": f"{len(resultados)} reglas generadas para {len(fechas)} fechas",
+        "fechas": fechas,
+        "total_transacciones": len(lista_transacciones),
+        "reglas": resultados
+    }
+
+
 def aplicar_apriori_todos():
-    db: Session = get_session_for_date(fecha)
-    fechas = db.query(VentaORM.fecha_venta).distinct().all()
-    fechas_unicas = sorted(set(f[0] for f in fechas))
+    db: Session = get_session()
+    try:
+        # El catálogo evita un DISTINCT sobre toda la tabla de ventas
+        fechas_unicas = [f[0] for f in db.query(FechaORM.fecha_venta).order_by(FechaORM.fecha).all()]
+    finally:
+        db.close()
 
     resultados_totales = {}
     for fecha in fechas_unicas:
@@ -77,21 +255,45 @@ def aplicar_apriori_todos():
     }
 
 
-def guardar_ventas_y_aplicar_apriori(fecha: str, ventas: List[Dict[str, Any]]):
-    db: Session = get_session_for_date(fecha)
-    try:
-        for v in ventas:
-            nueva = VentaORM(
-                id_venta=int(v["id_venta"]),
-                id_producto=int(v["id_producto"]),
-                fecha_venta=fecha
-            )
-            db.add(nueva)
-        db.commit()
-    except Exception as e:
-        db.rollback()
-        raise e
-    finally:
-        db.close()
+def registrar_fecha(db: Session, fecha: str, n_registros: int, n_ventas: int):
+    """Da de alta la fecha en el catálogo o suma los registros y ventas nuevos."""
+    clave = fecha_a_int(fecha)
+    entrada = db.get(FechaORM, clave)
+    if entrada is None:
+        db.add(FechaORM(fecha=clave, fecha_venta=fecha, n_registros=n_registros, n_ventas=n_ventas))
+    else:
+        entrada.n_registros += n_registros
+        entrada.n_ventas = (entrada.n_ventas or 0) + n_ventas
+
+
+def normalizar_venta(v: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Acepta el formato plano { "id_venta", "id_producto" } y el anidado de
+    example.json { "id_venta", "hora", "producto": { "id_prod", "cantidad", "precio_total" } }.
+    """
+    producto = v.get("producto") if isinstance(v.get("producto"), dict) else {}
+    id_producto = v.get("id_producto", producto.get("id_producto", producto.get("id_prod")))
+    cantidad = v.get("cantidad", producto.get("cantidad"))
+    precio_total = v.get("precio_total", producto.get("precio_total"))
+    return {
+        "id_venta": int(v["id_venta"]),
+        "id_producto": int(id_producto),
+        "id_cliente": None if v.get("id_cliente") is None else str(v["id_cliente"]),
+        "hora": None if v.get("hora") is None else int(v["hora"]),
+        "cantidad": None if cantidad is None else int(cantidad),
+        "precio_total": None if precio_total is None else float(precio_total),
+    }
+
 
-    return ejecutar_apriori_sqlite(fecha)
+def insertar_ventas(db: Session, fecha: str, normalizadas: List[Dict[str, Any]]):
+    """Añade las ventas y sus agregados a la sesión, sin hacer commit."""
+    clave = fecha_a_int(fecha)
+    # Antes de añadir las filas: necesitan ver qué ventas ya existían
+    actualizar_features(db, fecha, normalizadas)
+    n_ventas = actualizar_coocurrencias(db, fecha, normalizadas)
+    for v in normalizadas:
+        db.add(VentaORM(fecha_venta=fecha, fecha=clave, **v))
+    registrar_fecha(db, fecha, len(normalizadas), n_ventas)
+    # La sesión no hace autoflush: sin esto, la siguiente fecha del mismo
+    # lote no vería los clientes ni las fechas que se acaban de añadir
+    db.flush()
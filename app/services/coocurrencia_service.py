@@ -0,0 +1,166 @@
+# app/services/coocurrencia_service.py
+from collections import Counter, defaultdict
+from itertools import combinations
+from typing import List, Dict, Any, Optional
+
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from app.models.coocurrencia_model import CoocurrenciaORM
+from app.models.database import get_session
+from app.models.venta_model import VentaORM, FechaORM
+from app.utils.fechas import fecha_a_int
+
+
+def _celdas(anteriores: set, nuevos: set) -> Counter:
+    """Celdas a sumar cuando a una venta con `anteriores` se le añaden `nuevos`."""
+    celdas = Counter()
+    for item in nuevos:
+        celdas[(item, item)] += 1
+    for a, b in combinations(sorted(nuevos), 2):
+        celdas[(a, b)] += 1
+    for a in nuevos:
+        for b in anteriores:
+            celdas[(min(a, b), max(a, b))] += 1
+    return celdas
+
+
+def _sumar_celdas(db: Session, clave: int, celdas: Counter):
+    if not celdas:
+        return
+    stmt = insert(CoocurrenciaORM).values([
+        {"fecha": clave, "id_a": a, "id_b": b, "n": n} for (a, b), n in celdas.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["fecha", "id_a", "id_b"],
+        set_={"n": CoocurrenciaORM.n + stmt.excluded.n}
+    )
+    db.execute(stmt)
+
+
+def actualizar_coocurrencias(db: Session, fecha: str, ventas: List[Dict[str, Any]]) -> int:
+    """
+    Suma las ventas de `fecha` a su matriz de co-ocurrencia. Debe llamarse
+    antes de añadir las filas a la sesión. Devuelve cuántas ventas son nuevas.
+    """
+    clave = fecha_a_int(fecha)
+    entrantes = defaultdict(set)
+    for v in ventas:
+        entrantes[v["id_venta"]].add(v["id_producto"])
+    if not entrantes:
+        return 0
+
+    # Productos que ya tenían esas ventas (índice fecha, id_venta)
+    anteriores = defaultdict(set)
+    filas = (
+        db.query(VentaORM.id_venta, VentaORM.id_producto)
+        .filter(VentaORM.fecha == clave, VentaORM.id_venta.in_(list(entrantes)))
+    )
+    for id_venta, id_producto in filas:
+        anteriores[id_venta].add(id_producto)
+
+    celdas = Counter()
+    for id_venta, productos in entrantes.items():
+        celdas.update(_celdas(anteriores[id_venta], productos - anteriores[id_venta]))
+    _sumar_celdas(db, clave, celdas)
+
+    return sum(1 for id_venta in entrantes if not anteriores[id_venta])
+
+
+def reconstruir_coocurrencias(db: Session, fecha: str) -> int:
+    """Recalcula desde cero la matriz de `fecha`. Devuelve el número de ventas."""
+    clave = fecha_a_int(fecha)
+    db.query(CoocurrenciaORM).filter(CoocurrenciaORM.fecha == clave).delete(synchronize_session=False)
+
+    transacciones = defaultdict(set)
+    filas = db.query(VentaORM.id_venta, VentaORM.id_producto).filter(VentaORM.fecha == clave)
+    for id_venta, id_producto in filas:
+        transacciones[id_venta].add(id_producto)
+
+    celdas = Counter()
+    for productos in transacciones.values():
+        celdas.update(_celdas(set(), productos))
+    _sumar_celdas(db, clave, celdas)
+    return len(transacciones)
+
+
+def _total_ventas(db: Session, desde: int, hasta: int) -> int:
+    total = db.query(func.sum(FechaORM.n_ventas)).filter(FechaORM.fecha.between(desde, hasta)).scalar()
+    return total or 0
+
+
+def _matriz(db: Session, desde: int, hasta: int) -> Dict[tuple, int]:
+    # Un rango es la suma de las matrices de cada fecha
+    filas = (
+        db.query(CoocurrenciaORM.id_a, CoocurrenciaORM.id_b, func.sum(CoocurrenciaORM.n))
+        .filter(CoocurrenciaORM.fecha.between(desde, hasta))
+        .group_by(CoocurrenciaORM.id_a, CoocurrenciaORM.id_b)
+    )
+    return {(a, b): int(n) for a, b, n in filas}
+
+
+def metricas_par(desde: str, a: int, b: int, hasta: Optional[str] = None) -> Dict[str, Any]:
+    """Soporte, confianza y lift de a -> b leyendo tres celdas de la matriz."""
+    inicio, fin = fecha_a_int(desde), fecha_a_int(hasta or desde)
+    db: Session = get_session()
+    try:
+        total = _total_ventas(db, inicio, fin)
+
+        def celda(x, y):
+            return db.query(func.coalesce(func.sum(CoocurrenciaORM.n), 0)).filter(
+                CoocurrenciaORM.fecha.between(inicio, fin),
+                CoocurrenciaORM.id_a == min(x, y),
+                CoocurrenciaORM.id_b == max(x, y)
+            ).scalar()
+
+        n_ab, n_a, n_b = celda(a, b), celda(a, a), celda(b, b)
+    finally:
+        db.close()
+
+    if not total or not n_a or not n_b:
+        return {"antecedente": [a], "consecuente": [b], "soporte": 0.0, "confianza": 0.0, "lift": 0.0}
+    confianza = n_ab / n_a
+    return {
+        "antecedente": [a],
+        "consecuente": [b],
+        "soporte": round(n_ab / total, 4),
+        "confianza": round(confianza, 4),
+        "lift": round(confianza / (n_b / total), 4)
+    }
+
+
+def reglas_de_pares(desde: str, hasta: Optional[str] = None, min_support=0.1, min_confidence=0.5):
+    """Reglas 1 -> 1 directamente desde la matriz, sin minar."""
+    inicio, fin = fecha_a_int(desde), fecha_a_int(hasta or desde)
+    db: Session = get_session()
+    try:
+        total = _total_ventas(db, inicio, fin)
+        matriz = _matriz(db, inicio, fin) if total else {}
+    finally:
+        db.close()
+
+    if not total:
+        return {"mensaje": f"No hay datos entre {desde} y {hasta or desde}"}
+
+    resultados = []
+    for (a, b), n_ab in matriz.items():
+        if a == b or n_ab / total < min_support:
+            continue
+        for x, y in ((a, b), (b, a)):
+            confianza = n_ab / matriz[(x, x)]
+            if confianza >= min_confidence:
+                resultados.append({
+                    "antecedente": [x],
+                    "consecuente": [y],
+                    "soporte": round(n_ab / total, 4),
+                    "confianza": round(confianza, 4),
+                    "lift": round(confianza / (matriz[(y, y)] / total), 4)
+                })
+    resultados.sort(key=lambda r: (r["antecedente"], r["consecuente"]))
+
+    return {
+        "mensaje": f"{len(resultados)} reglas de pares",
+        "total_transacciones": total,
+        "reglas": resultados
+    }
@@ -0,0 +1,111 @@
+# app/services/eventos_service.py
+"""
+Difusión de cambios en las reglas por fecha (Server-Sent Events).
+
+El minero diferido publica aquí las reglas de cada fecha que re-mina; el
+canal las compara con la última versión y solo envía a los suscriptores
+las reglas agregadas, eliminadas o con métricas distintas. Así un minado
+sirve a todos los dashboards abiertos sobre esa fecha. Solo se guardan las
+reglas de fechas con algún suscriptor.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+from typing import List, Dict, Any, Optional, Tuple
+
+METRICAS = ("soporte", "confianza", "lift")
+
+
+def clave_regla(regla: Dict[str, Any]) -> str:
+    antecedente = ",".join(map(str, sorted(regla["antecedente"])))
+    consecuente = ",".join(map(str, sorted(regla["consecuente"])))
+    return f"{antecedente}->{consecuente}"
+
+
+class CanalReglas:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reglas = {}                        # fecha -> {clave: regla}
+        self._versiones = defaultdict(int)       # fecha -> versión publicada
+        self._suscriptores = defaultdict(set)    # fecha -> {(loop, cola)}
+
+    def suscribir(self, fecha: str) -> Tuple[Tuple[asyncio.AbstractEventLoop, asyncio.Queue], Optional[dict]]:
+        """
+        Registra una cola en el event loop actual. Devuelve también la foto
+        de las reglas vigentes, o None si la fecha aún no se ha publicado.
+        """
+        suscripcion = (asyncio.get_running_loop(), asyncio.Queue())
+        with self._lock:
+            self._suscriptores[fecha].add(suscripcion)
+            if fecha not in self._reglas:
+                return suscripcion, None
+            inicial = {
+                "tipo": "snapshot",
+                "fecha": fecha,
+                "version": self._versiones[fecha],
+                "reglas": list(self._reglas[fecha].values())
+            }
+        return suscripcion, inicial
+
+    def tiene_suscriptores(self, fecha: str) -> bool:
+        with self._lock:
+            return bool(self._suscriptores.get(fecha))
+
+    def cancelar(self, fecha: str, suscripcion):
+        with self._lock:
+            self._suscriptores[fecha].discard(suscripcion)
+            if not self._suscriptores[fecha]:
+                # Sin nadie escuchando no se guardan reglas; el próximo
+                # suscriptor pedirá un minado que vuelva a sembrar la foto
+                del self._suscriptores[fecha]
+                self._reglas.pop(fecha, None)
+
+    def publicar(self, fecha: str, reglas: List[Dict[str, Any]]):
+        """Guarda las reglas nuevas de `fecha` y envía la diferencia. Se puede llamar desde cualquier hilo."""
+        nuevas = {clave_regla(r): r for r in reglas}
+        with self._lock:
+            if not self._suscriptores.get(fecha):
+                return
+            anteriores = self._reglas.get(fecha)
+            if anteriores is None:
+                evento = {"tipo": "snapshot", "reglas": list(nuevas.values())}
+            else:
+                evento = {
+                    "tipo": "delta",
+                    "agregadas": [r for k, r in nuevas.items() if k not in anteriores],
+                    "eliminadas": [anteriores[k] for k in anteriores if k not in nuevas],
+                    "modificadas": [
+                        r for k, r in nuevas.items()
+                        if k in anteriores and any(r[m] != anteriores[k][m] for m in METRICAS)
+                    ]
+                }
+                if not (evento["agregadas"] or evento["eliminadas"] or evento["modificadas"]):
+                    return
+            self._reglas[fecha] = nuevas
+            self._versiones[fecha] += 1
+            evento.update({"fecha": fecha, "version": self._versiones[fecha]})
+            suscriptores = list(self._suscriptores.get(fecha, ()))
+        self._enviar(suscriptores, evento)
+
+    def publicar_error(self, fecha: str, detalle: str):
+        """Avisa a los suscriptores de `fecha` de que el minado falló."""
+        with self._lock:
+            evento = {
+                "tipo": "error",
+                "fecha": fecha,
+                "version": self._versiones[fecha],
+                "detalle": detalle
+            }
+            suscriptores = list(self._suscriptores.get(fecha, ()))
+        self._enviar(suscriptores, evento)
+
+    @staticmethod
+    def _enviar(suscriptores, evento):
+        for loop, cola in suscriptores:
+            try:
+                loop.call_soon_threadsafe(cola.put_nowait, evento)
+            except RuntimeError:
+                pass  # el loop del suscriptor ya se cerró
+
+
+canal = CanalReglas()
@@ -0,0 +1,146 @@
+# app/services/features_service.py
+from collections import defaultdict
+from datetime import timedelta
+from typing import List, Dict, Any, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.cliente_model import ClienteFeaturesORM
+from app.models.database import get_session
+from app.models.venta_model import VentaORM
+from app.utils.fechas import date_a_int, fecha_a_int, int_a_date, parsear_fecha
+
+VENTANA_DIAS = 30
+# Mismos nombres que app/utils/preprocessing.py
+DIAS = ["lunes", "martes", "miercoles", "jueves", "viernes", "sabado", "domingo"]
+
+
+def franja_horaria(hora: int) -> str:
+    if hora < 12:
+        return "mañana"
+    if hora < 19:
+        return "tarde"
+    return "noche"
+
+
+def _sumar(hist: dict, clave: str, n: int = 1) -> dict:
+    # Se devuelve un dict nuevo para que SQLAlchemy detecte el cambio en la columna JSON
+    nuevo = dict(hist or {})
+    nuevo[clave] = nuevo.get(clave, 0) + n
+    return nuevo
+
+
+def _expirar(ventana: dict, referencia: int) -> dict:
+    limite = date_a_int(int_a_date(referencia) - timedelta(days=VENTANA_DIAS - 1))
+    return {k: v for k, v in ventana.items() if int(k) >= limite}
+
+
+def actualizar_features(db: Session, fecha: str, ventas: List[Dict[str, Any]], existentes: Optional[set] = None):
+    """
+    Suma las ventas nuevas de `fecha` a las features de cada cliente.
+    Debe llamarse antes de añadir las filas a la sesión: una venta cuyo
+    id_venta ya existe en la fecha solo suma sus líneas, no otra compra.
+    `existentes` fija esos id_venta sin consultar la base.
+    """
+    clave = fecha_a_int(fecha)
+    dia = DIAS[parsear_fecha(fecha).weekday()]
+
+    por_cliente = defaultdict(lambda: defaultdict(list))
+    for v in ventas:
+        if v.get("id_cliente") is not None:
+            por_cliente[str(v["id_cliente"])][v["id_venta"]].append(v)
+    if not por_cliente:
+        return
+
+    if existentes is None:
+        ids_venta = {id_venta for compras in por_cliente.values() for id_venta in compras}
+        existentes = {
+            r[0] for r in db.query(VentaORM.id_venta)
+            .filter(VentaORM.fecha == clave, VentaORM.id_venta.in_(ids_venta))
+            .distinct()
+        }
+
+    for id_cliente, compras in por_cliente.items():
+        f = db.get(ClienteFeaturesORM, id_cliente)
+        if f is None:
+            f = ClienteFeaturesORM(
+                id_cliente=id_cliente, n_compras=0, suma_valor=0.0, n_lineas=0, n_recompras=0,
+                hist_horas={}, hist_dias={}, productos=[], ventana={}
+            )
+            db.add(f)
+
+        productos = set(f.productos or [])
+        ventana = dict(f.ventana or {})
+        for id_venta, lineas in compras.items():
+            if id_venta not in existentes:
+                f.n_compras += 1
+                hora = lineas[0].get("hora")
+                if hora is not None:
+                    f.hist_horas = _sumar(f.hist_horas, franja_horaria(int(hora)))
+                f.hist_dias = _sumar(f.hist_dias, dia)
+                ventana = _sumar(ventana, str(clave))
+
+            for linea in lineas:
+                f.n_lineas += 1
+                f.suma_valor += float(linea.get("precio_total") or 0.0)
+                if linea["id_producto"] in productos:
+                    f.n_recompras += 1
+            productos.update(linea["id_producto"] for linea in lineas)
+
+        f.ultima_fecha = max(f.ultima_fecha or clave, clave)
+        f.ventana = _expirar(ventana, f.ultima_fecha)
+        f.productos = sorted(productos)
+
+
+def reconstruir_features(db: Session):
+    """Recalcula desde cero las features de todos los clientes a partir de las ventas."""
+    db.query(ClienteFeaturesORM).delete(synchronize_session=False)
+    filas = (
+        db.query(VentaORM)
+        .filter(VentaORM.id_cliente.isnot(None))
+        .order_by(VentaORM.fecha, VentaORM.id)
+        .all()
+    )
+    por_fecha = defaultdict(list)
+    for r in filas:
+        por_fecha[r.fecha_venta].append({
+            "id_venta": r.id_venta,
+            "id_producto": r.id_producto,
+            "id_cliente": r.id_cliente,
+            "hora": r.hora,
+            "precio_total": r.precio_total,
+        })
+    for fecha, ventas in por_fecha.items():
+        # Todas las filas ya están en la base: ninguna venta cuenta como existente
+        actualizar_features(db, fecha, ventas, existentes=set())
+        # Sin autoflush: la siguiente fecha debe encontrar los clientes recién creados
+        db.flush()
+
+
+def features_de_cliente(f: ClienteFeaturesORM, referencia: int) -> Dict[str, Any]:
+    """Convierte los acumulados en el formato de UsuarioInput."""
+    vigentes = _expirar(f.ventana or {}, referencia)
+    return {
+        "id": f.id_cliente,
+        "n_compras_ultimos_30_dias": sum(n for k, n in vigentes.items() if int(k) <= referencia),
+        "hora_preferida": max(f.hist_horas, key=f.hist_horas.get) if f.hist_horas else "",
+        "dia_semana_frecuente": max(f.hist_dias, key=f.hist_dias.get) if f.hist_dias else "",
+        "promedio_valor_compra": round(f.suma_valor / f.n_compras, 2) if f.n_compras else 0.0,
+        "recompra_productos": round(f.n_recompras / f.n_lineas, 2) if f.n_lineas else 0.0,
+    }
+
+
+def obtener_features() -> List[Dict[str, Any]]:
+    """
+    Features de todos los clientes. La ventana de 30 días termina en la
+    última venta registrada: cada cliente solo expira días anteriores a su
+    propia última venta, que nunca es posterior a esa fecha.
+    """
+    db: Session = get_session()
+    try:
+        ref = db.query(func.max(ClienteFeaturesORM.ultima_fecha)).scalar()
+        clientes = db.query(ClienteFeaturesORM).order_by(ClienteFeaturesORM.id_cliente).all()
+        return [features_de_cliente(f, ref) for f in clientes]
+    finally:
+        db.close()
@@ -0,0 +1,196 @@
+# app/services/ingesta_service.py
+"""
+Escritura agrupada de ventas (group commit) y minado diferido.
+
+Cada POST /venta/{fecha} deja sus filas en un buffer y espera. Un hilo
+escritor junta lo que llegue durante INTERVALO_MS (o hasta MAX_FILAS filas),
+lo escribe en una sola transacción y entonces responde a todas las
+peticiones del grupo: la venta solo se confirma cuando el commit terminó.
+Las fechas escritas que tienen suscriptores en vivo se marcan para re-minar
+en otro hilo, que procesa cada fecha una vez aunque haya recibido muchas
+ventas entre tanto y publica los cambios de reglas en eventos_service. Las
+demás se minan bajo demanda con GET /apriori/{fecha}.
+"""
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future
+from typing import List, Dict, Any
+
+from app.models.database import get_session
+from app.services.apriori_service import ejecutar_apriori_sqlite, insertar_ventas, normalizar_venta
+from app.services.eventos_service import canal
+from app.utils.fechas import fecha_a_int
+
+INTERVALO_MS = 20
+MAX_FILAS = 500
+
+
+class MineroDiferido:
+    def __init__(self):
+        self._pendientes = set()
+        self._cond = threading.Condition()
+        self._hilo = None
+        self._activo = False
+
+    def marcar(self, fechas):
+        # Nadie recibiría las reglas de una fecha sin suscriptores
+        fechas = [f for f in fechas if canal.tiene_suscriptores(f)]
+        if not fechas:
+            return
+        with self._cond:
+            self._iniciar()
+            self._pendientes.update(fechas)
+            self._cond.notify()
+
+    def _iniciar(self):
+        if self._hilo is None or not self._hilo.is_alive():
+            self._activo = True
+            self._hilo = threading.Thread(target=self._bucle, name="minero-diferido", daemon=True)
+            self._hilo.start()
+
+    def _bucle(self):
+        while True:
+            with self._cond:
+                while not self._pendientes and self._activo:
+                    self._cond.wait()
+                if not self._pendientes:
+                    return
+                fechas, self._pendientes = self._pendientes, set()
+            for fecha in sorted(fechas, key=fecha_a_int):
+                try:
+                    self.minar(fecha)
+                except Exception as e:
+                    print(f"[X] Error re-minando {fecha}: {e}")
+
+    def minar(self, fecha: str):
+        try:
+            resultado = ejecutar_apriori_sqlite(fecha)
+        except Exception as e:
+            # Sin esto, quien espera la primera foto solo recibiría keepalives
+            canal.publicar_error(fecha, str(e))
+            raise
+        canal.publicar(fecha, resultado.get("reglas", []))
+
+    def detener(self):
+        with self._cond:
+            self._activo = False
+            self._cond.notify()
+        if self._hilo is not None:
+            self._hilo.join()
+
+
+class BufferEscritura:
+    def __init__(self, minero: MineroDiferido, intervalo_ms=INTERVALO_MS, max_filas=MAX_FILAS):
+        self.minero = minero
+        self.intervalo = intervalo_ms / 1000
+        self.max_filas = max_filas
+        self._pendientes = []   # [(fecha, ventas normalizadas, Future)]
+        self._filas = 0
+        self._cond = threading.Condition()
+        self._hilo = None
+        self._activo = False
+
+    def encolar(self, fecha: str, ventas: List[Dict[str, Any]]) -> Future:
+        # Se valida aquí para que un cuerpo inválido falle en su propia petición
+        fecha_a_int(fecha)
+        normalizadas = [normalizar_venta(v) for v in ventas]
+
+        futuro = Future()
+        with self._cond:
+            self._iniciar()
+            self._pendientes.append((fecha, normalizadas, futuro))
+            self._filas += len(normalizadas)
+            self._cond.notify()
+        return futuro
+
+    def _iniciar(self):
+        if self._hilo is None or not self._hilo.is_alive():
+            self._activo = True
+            self._hilo = threading.Thread(target=self._bucle, name="buffer-escritura", daemon=True)
+            self._hilo.start()
+
+    def _bucle(self):
+        while True:
+            with self._cond:
+                while not self._pendientes and self._activo:
+                    self._cond.wait()
+                if not self._pendientes:
+                    return
+                # Deja que el grupo crezca hasta el intervalo o el máximo de filas
+                limite = time.monotonic() + self.intervalo
+                while self._activo and self._filas < self.max_filas:
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        break
+                    self._cond.wait(restante)
+                lote, self._pendientes, self._filas = self._pendientes, [], 0
+            self._escribir(lote)
+
+    def _escribir(self, lote):
+        por_fecha = defaultdict(list)
+        for fecha, normalizadas, _ in lote:
+            por_fecha[fecha].extend(normalizadas)
+
+        db = None
+        try:
+            db = get_session()
+            for fecha, ventas in por_fecha.items():
+                insertar_ventas(db, fecha, ventas)
+            db.commit()
+        except Exception:
+            if db is not None:
+                db.rollback()
+            # Un lote con una petición inválida no debe tumbar a las demás
+            self._escribir_uno_a_uno(lote)
+            return
+        finally:
+            if db is not None:
+                db.close()
+
+        for _, normalizadas, futuro in lote:
+            futuro.set_result(len(normalizadas))
+        self.minero.marcar(por_fecha)
+
+    def _escribir_uno_a_uno(self, lote):
+        escritas = set()
+        for fecha, normalizadas, futuro in lote:
+            db = None
+            try:
+                db = get_session()
+                insertar_ventas(db, fecha, normalizadas)
+                db.commit()
+            except Exception as e:
+                if db is not None:
+                    db.rollback()
+                futuro.set_exception(e)
+                continue
+            finally:
+                if db is not None:
+                    db.close()
+            futuro.set_result(len(normalizadas))
+            escritas.add(fecha)
+        if escritas:
+            self.minero.marcar(escritas)
+
+    def detener(self):
+        """Escribe lo pendiente y para el hilo."""
+        with self._cond:
+            self._activo = False
+            self._cond.notify()
+        if self._hilo is not None:
+            self._hilo.join()
+
+
+minero = MineroDiferido()
+buffer = BufferEscritura(minero)
+
+
+def registrar_ventas(fecha: str, ventas: List[Dict[str, Any]]) -> int:
+    """Encola las ventas y espera al commit del grupo. Devuelve las filas escritas."""
+    return buffer.encolar(fecha, ventas).result()
+
+
+def detener():
+    buffer.detener()
+    minero.detener()
@@ -3,6 +3,7 @@ import os
 import json
 import onnxruntime as ort
 import numpy as np
+from app.services.features_service import obtener_features
 from app.utils.preprocessing import transformar_dato_crudo
 
 onnx_path = "models/kmeans_model.onnx"
@@ -51,4 +52,22 @@ def predecir_desde_archivo():
 
     # Hacer predicciones
     resultados = session.run([output_name], {input_name: X})[0]
-    return resultados.tolist()
\ No newline at end of file
+    return resultados.tolist()
+
+def predecir_clientes():
+    # Lee las features ya materializadas: no recorre el historial de ventas
+    clientes = obtener_features()
+    if not clientes:
+        return []
+
+    X = np.array([transformar_dato_crudo(c) for c in clientes], dtype=np.float32)
+
+    session = ort.InferenceSession(MODEL_PATH)
+    input_name = session.get_inputs()[0].name
+    output_name = session.get_outputs()[0].name
+
+    clusters = session.run([output_name], {input_name: X})[0]
+    return [
+        {"id": c["id"], "cluster": int(cluster), "features": c}
+        for c, cluster in zip(clientes, clusters)
+    ]
@@ -0,0 +1,26 @@
+# app/utils/fechas.py
+from datetime import date, datetime
+
+FORMATO_FECHA = "%d-%m-%Y"
+
+
+def parsear_fecha(fecha: str) -> date:
+    return datetime.strptime(fecha, FORMATO_FECHA).date()
+
+
+def date_a_int(d: date) -> int:
+    return d.year * 10000 + d.month * 100 + d.day
+
+
+def int_a_date(valor: int) -> date:
+    return date(valor // 10000, valor // 100 % 100, valor % 100)
+
+
+def fecha_a_int(fecha: str) -> int:
+    # "01-07-2025" -> 20250701, ordena cronológicamente
+    return date_a_int(parsear_fecha(fecha))
+
+
+def int_a_fecha(valor: int) -> str:
+    # 20250701 -> "01-07-2025"
+    return f"{valor % 100:02d}-{valor // 100 % 100:02d}-{valor // 10000:04d}"
@@ -0,0 +1,104 @@
+# app/utils/migrar_ventas.py
+"""
+Migra las bases por día (data/DD-MM-YYYY/ventas.sqlite) y la base suelta
+data/ventas.db al almacén consolidado data/todos/ventas.sqlite.
+
+Uso: python -m app.utils.migrar_ventas [--forzar]
+
+Se puede ejecutar varias veces: las fechas que ya están en el catálogo del
+almacén se omiten, para no perder ventas registradas después por la API.
+Con --forzar esas fechas se reemplazan completas (ventas, catálogo y matriz
+de co-ocurrencia) y, si se borraron ventas con cliente, se recalculan las
+features de clientes.
+Si una fecha aparece en su base por día y en data/ventas.db, manda la base por día.
+"""
+import argparse
+import glob
+import os
+from collections import defaultdict
+
+from sqlalchemy import create_engine, text
+
+from app.models.database import DATA_PATH, get_engine, get_engine_for_date, get_session
+from app.models.venta_model import VentaORM, FechaORM
+from app.services.coocurrencia_service import reconstruir_coocurrencias
+from app.services.features_service import reconstruir_features
+from app.utils.fechas import fecha_a_int
+
+LEGACY_DB_PATH = os.path.join(DATA_PATH, 'ventas.db')
+
+
+def leer_base(engine):
+    """Devuelve {fecha_venta: [(id_venta, id_producto), ...]} de una base antigua."""
+    por_fecha = defaultdict(list)
+    with engine.connect() as conn:
+        filas = conn.execute(text("SELECT id_venta, id_producto, fecha_venta FROM ventas ORDER BY id"))
+        for id_venta, id_producto, fecha_venta in filas:
+            por_fecha[fecha_venta].append((int(id_venta), int(id_producto)))
+    engine.dispose()
+    return por_fecha
+
+
+def recolectar_particiones():
+    particiones = {}
+    if os.path.exists(LEGACY_DB_PATH):
+        particiones.update(leer_base(create_engine(f"sqlite:///{LEGACY_DB_PATH}")))
+
+    for path in sorted(glob.glob(os.path.join(DATA_PATH, '*', 'ventas.sqlite'))):
+        carpeta = os.path.basename(os.path.dirname(path))
+        try:
+            fecha_a_int(carpeta)
+        except ValueError:
+            continue  # data/todos u otras carpetas que no son fechas
+        for fecha, filas in leer_base(get_engine_for_date(carpeta)).items():
+            particiones[fecha] = filas
+    return particiones
+
+
+def migrar(forzar=False):
+    particiones = recolectar_particiones()
+    migradas = 0
+    db = get_session()
+    try:
+        catalogadas = {f[0] for f in db.query(FechaORM.fecha)}
+        borradas_con_cliente = False
+        for fecha, filas in sorted(particiones.items(), key=lambda p: fecha_a_int(p[0])):
+            clave = fecha_a_int(fecha)
+            if clave in catalogadas:
+                if not forzar:
+                    print(f"[--] {fecha}: ya está en el almacén, se omite (usa --forzar para reemplazarla)")
+                    continue
+                borradas_con_cliente = borradas_con_cliente or db.query(VentaORM.id).filter(
+                    VentaORM.fecha == clave, VentaORM.id_cliente.isnot(None)
+                ).first() is not None
+                db.query(VentaORM).filter(VentaORM.fecha == clave).delete(synchronize_session=False)
+                db.query(FechaORM).filter(FechaORM.fecha == clave).delete(synchronize_session=False)
+            db.bulk_insert_mappings(VentaORM, [
+                {"id_venta": id_venta, "id_producto": id_producto, "fecha_venta": fecha, "fecha": clave}
+                for id_venta, id_producto in filas
+            ])
+            db.flush()
+            n_ventas = reconstruir_coocurrencias(db, fecha)
+            db.add(FechaORM(fecha=clave, fecha_venta=fecha, n_registros=len(filas), n_ventas=n_ventas))
+            migradas += 1
+            print(f"[OK] {fecha}: {len(filas)} registros")
+        if borradas_con_cliente:
+            db.flush()
+            reconstruir_features(db)
+            print("[OK] Features de clientes recalculadas")
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+        # Cierra las conexiones para volcar el WAL al archivo principal
+        get_engine().dispose()
+
+    print(f"[OK] {migradas} fechas migradas al almacén consolidado")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migra las bases por día al almacén consolidado")
+    parser.add_argument("--forzar", action="store_true", help="Reemplazar fechas que ya están en el almacén")
+    migrar(parser.parse_args().forzar)
@@ -0,0 +1,309 @@
+# carga/prueba_carga.py
+"""
+Prueba de carga de extremo a extremo contra app.main:app.
+
+Lanza a ritmo fijo (lazo abierto) una mezcla de POST /venta/{fecha},
+GET /apriori/{fecha} y POST /predict con cestas y clientes sintéticos, y
+compara p50/p95/p99, throughput y tasa de error de cada ruta con sus SLO.
+La latencia se mide desde el instante en que la petición debía salir, así
+que un servidor saturado no esconde su cola frenando al generador.
+
+Uso:
+    # Levanta la API en un hilo, con una carpeta de datos temporal
+    python -m carga.prueba_carga --duracion 30 --tasa venta=50 --tasa apriori=2 --tasa predict=20
+
+    # Contra una instancia ya levantada. OJO: escribe las ventas sintéticas
+    # (y sus clientes carga_*) en el almacén de esa instancia
+    python -m carga.prueba_carga --url http://127.0.0.1:8000 --slo venta:p99=250
+
+Sale con código 1 si alguna ruta incumple su SLO.
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+# Objetivos por defecto, en milisegundos; "error" es la tasa de error máxima
+SLO_POR_DEFECTO = {
+    "venta": {"p95": 100, "p99": 250, "error": 0.01},
+    "apriori": {"p95": 1000, "p99": 2000, "error": 0.01},
+    "predict": {"p95": 50, "p99": 100, "error": 0.01},
+}
+TASAS_POR_DEFECTO = {"venta": 50.0, "apriori": 2.0, "predict": 20.0}
+# Rutas que sabe generar Generador (un método por ruta)
+RUTAS = tuple(SLO_POR_DEFECTO)
+# Segundos máximos para que arranque la API local
+ARRANQUE_TIMEOUT = 30.0
+
+HORAS = ["mañana", "tarde", "noche"]
+DIAS = ["lunes", "martes", "miercoles", "jueves", "viernes", "sabado", "domingo"]
+
+
+class Generador:
+    """Construye las peticiones sintéticas de cada ruta."""
+
+    def __init__(self, fecha, n_productos=25, n_clientes=200):
+        self.fecha = fecha
+        self.n_productos = n_productos
+        self.n_clientes = n_clientes
+        # Ventas y clientes propios de esta ejecución: repetir la prueba contra
+        # la misma instancia no debe mezclarse con las cestas de otra anterior
+        self.ejecucion = time.time_ns()
+        self._id_venta = self.ejecucion
+        self._lock = threading.Lock()
+
+    def _siguiente_venta(self):
+        with self._lock:
+            self._id_venta += 1
+            return self._id_venta
+
+    def venta(self):
+        id_venta = self._siguiente_venta()
+        id_cliente = f"carga_{self.ejecucion}_{random.randrange(self.n_clientes):03}"
+        hora = random.randint(7, 21)
+        cesta = [
+            {
+                "id_venta": id_venta,
+                "id_cliente": id_cliente,
+                "hora": hora,
+                "producto": {
+                    "id_prod": id_producto,
+                    "cantidad": random.randint(1, 5),
+                    "precio_total": round(random.uniform(1, 20), 2)
+                }
+            }
+            for id_producto in random.sample(range(1, self.n_productos + 1), random.randint(1, 6))
+        ]
+        return "POST", f"/venta/{self.fecha}", cesta
+
+    def apriori(self):
+        return "GET", f"/apriori/{self.fecha}", None
+
+    def predict(self):
+        cliente = {
+            "id": f"cliente_{random.randrange(self.n_clientes):03}",
+            "n_compras_ultimos_30_dias": random.randint(1, 30),
+            "hora_preferida": random.choice(HORAS),
+            "dia_semana_frecuente": random.choice(DIAS),
+            "promedio_valor_compra": round(random.uniform(10, 200), 2),
+            "recompra_productos": round(random.uniform(0, 1), 2)
+        }
+        return "POST", "/predict", cliente
+
+
+def enviar(url_base, metodo, ruta, cuerpo, timeout):
+    datos = None if cuerpo is None else json.dumps(cuerpo).encode("utf-8")
+    peticion = urllib.request.Request(url_base + ruta, data=datos, method=metodo)
+    peticion.add_header("Content-Type", "application/json")
+    try:
+        with urllib.request.urlopen(peticion, timeout=timeout) as respuesta:
+            respuesta.read()
+            return respuesta.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except Exception:
+        return None
+
+
+def percentil(valores, p):
+    if not valores:
+        return float("nan")
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, max(0, int(round(p / 100 * len(ordenados))) - 1))
+    return ordenados[indice]
+
+
+def ejecutar_carga(url_base, tasas, duracion, generador, max_hilos=256, timeout=30.0):
+    """
+    Un hilo por ruta programa las peticiones cada 1/tasa segundos y las
+    entrega a un pool; devuelve {ruta: [(latencia_s, status), ...]}.
+    """
+    resultados = defaultdict(list)
+    lock = threading.Lock()
+    pool = ThreadPoolExecutor(max_workers=max_hilos)
+    inicio = time.monotonic() + 0.1
+
+    def medir(nombre, programado, metodo, ruta, cuerpo):
+        status = enviar(url_base, metodo, ruta, cuerpo, timeout)
+        latencia = time.monotonic() - programado
+        with lock:
+            resultados[nombre].append((latencia, status))
+
+    def programar(nombre, tasa):
+        construir = getattr(generador, nombre)
+        k = 0
+        while True:
+            programado = inicio + k / tasa
+            if programado - inicio >= duracion:
+                return
+            espera = programado - time.monotonic()
+            if espera > 0:
+                time.sleep(espera)
+            pool.submit(medir, nombre, programado, *construir())
+            k += 1
+
+    hilos = [
+        threading.Thread(target=programar, args=(nombre, tasa), daemon=True)
+        for nombre, tasa in tasas.items() if tasa > 0
+    ]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    pool.shutdown(wait=True)
+    return resultados
+
+
+def informe(resultados, tasas, duracion, slos):
+    """Imprime la tabla por ruta y devuelve True si se cumplen todos los SLO."""
+    todo_ok = True
+    print(f"\n{'ruta':<10}{'objetivo':>10}{'real':>8}{'n':>7}{'error':>8}{'p50':>9}{'p95':>9}{'p99':>9}  SLO")
+    for nombre, tasa in tasas.items():
+        muestras = resultados.get(nombre, [])
+        n = len(muestras)
+        ok_lat = [lat * 1000 for lat, status in muestras if status is not None and status < 400]
+        tasa_error = (n - len(ok_lat)) / n if n else 0.0
+        slo = slos.get(nombre, {})
+        p = {q: percentil(ok_lat, q) for q in (50, 95, 99)}
+        p.update({clave: percentil(ok_lat, float(clave[1:])) for clave in slo if clave != "error"})
+
+        fallos = []
+        if tasa > 0 and not ok_lat:
+            # Sin respuestas correctas los percentiles son nan y pasarían cualquier límite
+            fallos.append("sin respuestas correctas" if n else "sin muestras")
+        for clave, limite in slo.items():
+            if clave == "error":
+                if tasa_error > limite:
+                    fallos.append(f"error {tasa_error:.1%} > {limite:.1%}")
+            elif p[clave] > limite:
+                fallos.append(f"{clave} {p[clave]:.0f} > {limite:.0f} ms")
+        todo_ok = todo_ok and not fallos
+
+        print(
+            f"{nombre:<10}{tasa:>8.1f}/s{n / duracion:>6.1f}/s{n:>7}{tasa_error:>8.1%}"
+            f"{p[50]:>7.1f}ms{p[95]:>7.1f}ms{p[99]:>7.1f}ms  "
+            + ("[OK]" if not fallos else "[X] " + "; ".join(fallos))
+        )
+    return todo_ok
+
+
+def _puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def levantar_servidor():
+    """Arranca app.main:app con uvicorn en un hilo sobre una carpeta de datos temporal."""
+    os.environ.setdefault("API_PAN_DATA", tempfile.mkdtemp(prefix="api-pan-carga-"))
+    import uvicorn
+    from app.main import app
+
+    puerto = _puerto_libre()
+    servidor = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=puerto, log_level="warning"))
+    hilo = threading.Thread(target=servidor.run, daemon=True)
+    hilo.start()
+    limite = time.monotonic() + ARRANQUE_TIMEOUT
+    while not servidor.started:
+        if not hilo.is_alive():
+            raise SystemExit("[X] La API no pudo arrancar")
+        if time.monotonic() > limite:
+            servidor.should_exit = True
+            raise SystemExit(f"[X] La API no arrancó en {ARRANQUE_TIMEOUT:.0f}s")
+        time.sleep(0.05)
+    print(f"[OK] API levantada en http://127.0.0.1:{puerto} (datos en {os.environ['API_PAN_DATA']})")
+    return f"http://127.0.0.1:{puerto}", servidor, hilo
+
+
+def _parsear_pares(valores, nombre):
+    pares = {}
+    for valor in valores or []:
+        clave, _, numero = valor.partition("=")
+        if not numero:
+            raise SystemExit(f"[X] {nombre} mal formado: '{valor}'")
+        try:
+            pares[clave] = float(numero)
+        except ValueError:
+            raise SystemExit(f"[X] {nombre} mal formado: '{valor}'")
+    return pares
+
+
+def _validar_ruta(ruta, nombre):
+    if ruta not in RUTAS:
+        raise SystemExit(f"[X] {nombre}: ruta desconocida '{ruta}' (válidas: {', '.join(RUTAS)})")
+
+
+def _validar_metrica(metrica):
+    """Acepta "error" o un percentil "pNN" entre 0 y 100."""
+    if metrica == "error":
+        return
+    try:
+        q = float(metrica[1:]) if metrica.startswith("p") else None
+    except ValueError:
+        q = None
+    if q is None or not 0 < q <= 100:
+        raise SystemExit(f"[X] --slo: métrica desconocida '{metrica}' (usa error o pNN, p. ej. p90)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prueba de carga de API-Pan")
+    parser.add_argument("--url", help="URL de una instancia ya levantada (escribe en su almacén); "
+                                      "si no, se levanta una en local con datos temporales")
+    parser.add_argument("--duracion", type=float, default=30.0, help="Segundos de carga")
+    parser.add_argument("--tasa", action="append", metavar="RUTA=RPS",
+                        help="Peticiones por segundo de venta, apriori o predict")
+    parser.add_argument("--slo", action="append", metavar="RUTA:MÉTRICA=VALOR",
+                        help="Ej.: venta:p99=250 (ms) o predict:error=0.05")
+    parser.add_argument("--fecha", default="01-01-2030", help="Fecha sintética DD-MM-YYYY")
+    parser.add_argument("--precarga", type=int, default=200, help="Ventas insertadas antes de medir")
+    parser.add_argument("--semilla", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    random.seed(args.semilla)
+    tasas = dict(TASAS_POR_DEFECTO)
+    for ruta, tasa in _parsear_pares(args.tasa, "--tasa").items():
+        _validar_ruta(ruta, "--tasa")
+        tasas[ruta] = tasa
+
+    slos = {ruta: dict(valores) for ruta, valores in SLO_POR_DEFECTO.items()}
+    for clave, valor in _parsear_pares(args.slo, "--slo").items():
+        ruta, _, metrica = clave.partition(":")
+        _validar_ruta(ruta, "--slo")
+        _validar_metrica(metrica)
+        slos[ruta][metrica] = valor
+
+    servidor = hilo = None
+    if args.url:
+        url_base = args.url.rstrip("/")
+    else:
+        url_base, servidor, hilo = levantar_servidor()
+
+    generador = Generador(args.fecha)
+    try:
+        # Precarga para que GET /apriori tenga datos desde el principio
+        for _ in range(args.precarga):
+            enviar(url_base, *generador.venta(), timeout=30.0)
+
+        print(f"Carga durante {args.duracion:.0f}s: " + ", ".join(f"{r}={t:g}/s" for r, t in tasas.items()))
+        resultados = ejecutar_carga(url_base, tasas, args.duracion, generador)
+        ok = informe(resultados, tasas, args.duracion, slos)
+    finally:
+        if servidor is not None:
+            servidor.should_exit = True
+            hilo.join()
+
+    print("\n[OK] Se cumplen todos los SLO" if ok else "\n[X] Hay SLO incumplidos")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -147,6 +147,16 @@ function mostrarStatus(mensaje, tipo) {
     statusDiv.style.display = 'block';
 }
 
+/**
+ * Muestra un mensaje de error
+ * @param {string} mensaje - Mensaje de error
+ */
+function mostrarError(mensaje) {
+    const errorDiv = document.getElementById('error');
+    errorDiv.textContent = mensaje;
+    errorDiv.style.display = 'block';
+}
+
 /**
  * Prueba la conexión al servidor sin hacer la petición completa
  */
@@ -231,6 +241,124 @@ function validarURL(url) {
     }
 }
 
+// Conexión SSE abierta y reglas vigentes, indexadas por "antecedente->consecuente"
+let fuenteEventos = null;
+let reglasEnVivo = new Map();
+
+/**
+ * Clave de una regla, igual a la que usa el servidor
+ * @param {Object} regla - Regla con antecedente y consecuente
+ * @returns {string} - Clave de la regla
+ */
+function claveRegla(regla) {
+    const ordenar = lista => [...lista].sort((a, b) => a - b).join(',');
+    return `${ordenar(regla.antecedente)}->${ordenar(regla.consecuente)}`;
+}
+
+/**
+ * Se suscribe a /apriori/stream/{fecha}: el servidor envía primero todas las
+ * reglas y luego solo los cambios, sin volver a pedir la lista completa
+ */
+function seguirEnVivo() {
+    const fecha = document.getElementById('fechaVivo').value.trim();
+    const apiUrl = document.getElementById('apiUrl').value.trim();
+
+    if (!fecha) {
+        mostrarError('Por favor, ingresa una fecha');
+        return;
+    }
+    if (!validarURL(apiUrl)) {
+        mostrarError('Por favor, ingresa una URL válida');
+        return;
+    }
+
+    detenerEnVivo();
+    reglasEnVivo = new Map();
+
+    const base = new URL(apiUrl).origin;
+    fuenteEventos = new EventSource(`${base}/apriori/stream/${encodeURIComponent(fecha)}`);
+
+    fuenteEventos.addEventListener('snapshot', (e) => {
+        const evento = JSON.parse(e.data);
+        reglasEnVivo = new Map(evento.reglas.map(r => [claveRegla(r), r]));
+        mostrarReglasEnVivo(evento);
+    });
+
+    fuenteEventos.addEventListener('delta', (e) => {
+        const evento = JSON.parse(e.data);
+        evento.eliminadas.forEach(r => reglasEnVivo.delete(claveRegla(r)));
+        [...evento.agregadas, ...evento.modificadas].forEach(r => reglasEnVivo.set(claveRegla(r), r));
+        mostrarReglasEnVivo(evento);
+    });
+
+    // El evento "error" llega tanto si falla el minado (trae datos) como si se corta la conexión
+    fuenteEventos.addEventListener('error', (e) => {
+        if (e.data) {
+            const evento = JSON.parse(e.data);
+            mostrarError(`Error al minar ${evento.fecha}: ${evento.detalle}`);
+            mostrarStatus('❌ Falló el minado de la fecha', 'error');
+        } else {
+            mostrarStatus('⚠️ Conexión en vivo interrumpida, reintentando...', 'error');
+        }
+    });
+
+    mostrarStatus(`Siguiendo las reglas del ${fecha} en vivo...`, 'success');
+}
+
+/**
+ * Cierra la conexión en vivo si hay una abierta
+ */
+function detenerEnVivo() {
+    if (fuenteEventos) {
+        fuenteEventos.close();
+        fuenteEventos = null;
+        mostrarStatus('Seguimiento en vivo detenido', 'success');
+    }
+}
+
+/**
+ * Pinta las reglas vigentes de la conexión en vivo
+ * @param {Object} evento - Último evento recibido (snapshot o delta)
+ */
+function mostrarReglasEnVivo(evento) {
+    const resultsDiv = document.getElementById('results');
+    const predictionsContainer = document.getElementById('predictionsContainer');
+    predictionsContainer.innerHTML = '';
+
+    const infoDiv = document.createElement('div');
+    infoDiv.className = 'info-general';
+    infoDiv.innerHTML = `
+        <h3>📡 Reglas en vivo</h3>
+        <p><strong>Fecha:</strong> ${evento.fecha}</p>
+        <p><strong>Versión:</strong> ${evento.version}</p>
+        <h4>Reglas vigentes (${reglasEnVivo.size}):</h4>
+    `;
+    predictionsContainer.appendChild(infoDiv);
+
+    [...reglasEnVivo.values()]
+        .sort((a, b) => b.confianza - a.confianza)
+        .forEach((regla, index) => {
+            const reglaDiv = document.createElement('div');
+            reglaDiv.className = 'regla-item';
+            reglaDiv.innerHTML = `
+                <div class="regla-header">
+                    <span>Regla ${index + 1}:</span>
+                    <span class="regla-soporte">Soporte: ${(regla.soporte * 100).toFixed(2)}%</span>
+                </div>
+                <div class="regla-body">
+                    <p>Si se compra <strong>${regla.antecedente.join(', ')}</strong>, entonces también se compra <strong>${regla.consecuente.join(', ')}</strong></p>
+                    <div class="regla-metrics">
+                        <span>Confianza: ${(regla.confianza * 100).toFixed(2)}%</span>
+                        <span>Lift: ${regla.lift.toFixed(2)}</span>
+                    </div>
+                </div>
+            `;
+            predictionsContainer.appendChild(reglaDiv);
+        });
+
+    resultsDiv.classList.add('show');
+}
+
 // Modifica el event listener para usar la nueva función
 document.addEventListener('DOMContentLoaded', function() {
     document.getElementById('apiUrl').addEventListener('keypress', function(e) {
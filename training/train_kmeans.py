@@ -1,8 +1,26 @@
 # training/train_kmeans.py
+"""
+Entrena el KMeans de clientes y lo exporta a ONNX como un único pipeline
+(StandardScaler + KMeans), así el servicio sigue haciendo una sola inferencia.
+
+Uso:
+    python training/train_kmeans.py                  # k=3, semilla 42
+    python training/train_kmeans.py --barrido --k-min 2 --k-max 8 --semillas 5
 
+En modo barrido se entrena cada combinación de k y semilla en un pool de
+procesos; de cada k se queda la semilla con menor inercia y entre los k
+gana la mayor silueta, calculada sobre una misma muestra de clientes para
+todas las combinaciones, así escala a muchos clientes y las siluetas son
+comparables entre sí.
+"""
+import argparse
 import json
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from sklearn.cluster import KMeans
+from sklearn.metrics import silhouette_score
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
 from skl2onnx import convert_sklearn
 from skl2onnx.common.data_types import FloatTensorType
 import os
@@ -27,47 +45,146 @@ dia_map = {
 # Ruta del archivo JSON
 DATA_PATH = os.path.join(os.path.dirname(__file__), 'datos_fit.json')
 MODEL_PATH = os.path.join(os.path.dirname(__file__), '..', 'models', 'kmeans_model.onnx')
-print(f"Buscando archivo en: {DATA_PATH}")
 
-# Leer datos desde el JSON
-with open(DATA_PATH, 'r', encoding='utf-8') as file:
-    datos = json.load(file)
+# Datos y muestra de silueta de cada proceso del barrido; se reciben una
+# sola vez al arrancar el proceso en vez de en cada tarea
+_X = None
+_muestra = None
 
-# Convertir datos en una lista de listas con verificación
-X = []
-for cliente in datos:
-    try:
-        compras = float(cliente["n_compras_ultimos_30_dias"])
-        hora = hora_map.get(cliente["hora_preferida"].lower(), -1)
-        dia = dia_map.get(cliente["dia_semana_frecuente"].lower(), -1)
-        promedio = float(cliente["promedio_valor_compra"])
-        recompra = float(cliente["recompra_productos"])
 
-        if hora == -1 or dia == -1:
-            raise ValueError("Valor no reconocido en hora_preferida o dia_semana_frecuente")
+def cargar_datos(path):
+    print(f"Buscando archivo en: {path}")
 
-        X.append([compras, hora, dia, promedio, recompra])
-    except Exception as e:
-        print(f"[X] Error en cliente: {cliente}\n{e}")
+    # Leer datos desde el JSON
+    with open(path, 'r', encoding='utf-8') as file:
+        datos = json.load(file)
 
-X = np.array(X)
+    # Convertir datos en una lista de listas con verificación
+    X = []
+    for cliente in datos:
+        try:
+            compras = float(cliente["n_compras_ultimos_30_dias"])
+            hora = hora_map.get(cliente["hora_preferida"].lower(), -1)
+            dia = dia_map.get(cliente["dia_semana_frecuente"].lower(), -1)
+            promedio = float(cliente["promedio_valor_compra"])
+            recompra = float(cliente["recompra_productos"])
 
-# Entrenar modelo KMeans
-kmeans = KMeans(n_clusters=3, random_state=42)
-kmeans.fit(X)
-""" n_clusters=3 
-Cluster 0 → Clientes que compran mucho y recompran seguido.
+            if hora == -1 or dia == -1:
+                raise ValueError("Valor no reconocido en hora_preferida o dia_semana_frecuente")
 
-Cluster 1 → Clientes ocasionales, compras pequeñas.
+            X.append([compras, hora, dia, promedio, recompra])
+        except Exception as e:
+            print(f"[X] Error en cliente: {cliente}\n{e}")
 
-Cluster 2 → Clientes de alto valor pero baja frecuencia.
-"""
-# Convertir a ONNX
-initial_type = [("float_input", FloatTensorType([None, 5]))]
-onnx_model = convert_sklearn(kmeans, initial_types=initial_type)
+    # float32: es lo que recibe el modelo ONNX en el servicio
+    return np.array(X, dtype=np.float32)
+
+
+def crear_pipeline(k, semilla):
+    # Sin escalar, promedio_valor_compra (10-200) domina la distancia
+    return Pipeline([
+        ("scaler", StandardScaler()),
+        ("kmeans", KMeans(n_clusters=k, random_state=semilla, n_init=1)),
+    ])
+
+
+def _iniciar_proceso(X, muestra):
+    global _X, _muestra
+    _X, _muestra = X, muestra
+
+
+def evaluar(k, semilla):
+    """Entrena un pipeline sobre _X y devuelve su inercia y su silueta en _muestra."""
+    pipeline = crear_pipeline(k, semilla).fit(_X)
+    X_escalado = pipeline.named_steps["scaler"].transform(_X[_muestra])
+    etiquetas = pipeline.named_steps["kmeans"].labels_[_muestra]
+    silueta = silhouette_score(X_escalado, etiquetas)
+    return {
+        "k": k,
+        "semilla": semilla,
+        "inercia": float(pipeline.named_steps["kmeans"].inertia_),
+        "silueta": float(silueta)
+    }
+
+
+def barrido(X, valores_k, semillas, muestra_silueta=2000, n_procesos=None):
+    """Evalúa todas las combinaciones de k y semilla en paralelo y elige la mejor."""
+    combinaciones = [(k, s) for k in valores_k for s in semillas]
+    # La misma muestra para todas: con una distinta por semilla, la silueta
+    # de cada combinación mediría también la suerte del muestreo
+    rng = np.random.default_rng(semillas[0])
+    muestra = np.sort(rng.choice(len(X), size=min(muestra_silueta, len(X)), replace=False))
+    with ProcessPoolExecutor(max_workers=n_procesos, initializer=_iniciar_proceso,
+                             initargs=(X, muestra)) as pool:
+        resultados = list(pool.map(
+            evaluar,
+            [k for k, _ in combinaciones],
+            [s for _, s in combinaciones]
+        ))
+
+    # Por cada k, la inicialización con menor inercia
+    mejores_por_k = {}
+    for r in resultados:
+        if r["k"] not in mejores_por_k or r["inercia"] < mejores_por_k[r["k"]]["inercia"]:
+            mejores_por_k[r["k"]] = r
+
+    print(f"\n{'k':>3}{'semilla':>9}{'inercia':>12}{'silueta':>10}")
+    for k in sorted(mejores_por_k):
+        r = mejores_por_k[k]
+        print(f"{k:>3}{r['semilla']:>9}{r['inercia']:>12.2f}{r['silueta']:>10.4f}")
+
+    elegido = max(mejores_por_k.values(), key=lambda r: r["silueta"])
+    print(f"\n[OK] Elegido k={elegido['k']} (semilla {elegido['semilla']}, silueta {elegido['silueta']:.4f})")
+    return elegido
+
+
+def exportar(pipeline, path):
+    # Convertir a ONNX: el scaler va dentro del grafo
+    initial_type = [("float_input", FloatTensorType([None, 5]))]
+    onnx_model = convert_sklearn(pipeline, initial_types=initial_type)
+
+    # Guardar el modelo
+    with open(path, "wb") as f:
+        f.write(onnx_model.SerializeToString())
+
+    print(f"[OK] Modelo guardado en {path}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Entrena el KMeans de clientes")
+    parser.add_argument("--datos", default=DATA_PATH)
+    parser.add_argument("--salida", default=MODEL_PATH)
+    parser.add_argument("--k", type=int, default=3, help="Número de clusters sin barrido")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--barrido", action="store_true", help="Barrer k y semillas y elegir el mejor")
+    parser.add_argument("--k-min", type=int, default=2)
+    parser.add_argument("--k-max", type=int, default=8)
+    parser.add_argument("--semillas", type=int, default=5, help="Inicializaciones por k")
+    parser.add_argument("--muestra-silueta", type=int, default=2000, help="Clientes usados para la silueta")
+    parser.add_argument("--procesos", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    X = cargar_datos(args.datos)
+
+    k, semilla = args.k, args.semilla
+    if args.barrido:
+        # La silueta necesita 2 <= k < número de clientes
+        valores_k = range(max(2, args.k_min), min(args.k_max, len(X) - 1) + 1)
+        semillas = [args.semilla + i for i in range(args.semillas)]
+        if not valores_k:
+            raise SystemExit(
+                f"[X] Ningún k posible entre {args.k_min} y {args.k_max} con {len(X)} clientes "
+                "(la silueta necesita 2 <= k < clientes)"
+            )
+        if not semillas:
+            raise SystemExit("[X] --semillas debe ser al menos 1")
+        elegido = barrido(X, valores_k, semillas, args.muestra_silueta, args.procesos)
+        k, semilla = elegido["k"], elegido["semilla"]
+
+    # Entrenar el pipeline final
+    pipeline = crear_pipeline(k, semilla).fit(X)
+    exportar(pipeline, args.salida)
 
-# Guardar el modelo
-with open(MODEL_PATH, "wb") as f:
-    f.write(onnx_model.SerializeToString())
 
-print(f"[OK] Modelo guardado en {MODEL_PATH}")
+if __name__ == "__main__":
+    main()